@@ -1,13 +1,43 @@
 import numpy as np
 from PIL import Image
 import argparse
-from collections import defaultdict
+
+try:
+    from scipy.signal import convolve2d
+except ImportError:
+    convolve2d = None # Optional; the 512-entry patch LUT path covers the bulk step
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Define colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255) # Use tuple for consistency even if images are grayscale
 
+# 3x3 Moore-neighborhood kernel (center excluded) for the bulk neighbor count
+KERNEL = np.array([[1, 1, 1],
+                   [1, 0, 1],
+                   [1, 1, 1]], dtype=np.uint8)
+
+def _build_rule_lut():
+    """
+    512-entry lookup table over 3x3 patches: the index is the patch packed
+    into 9 bits (row-major, bit k for cell k), the value the center cell's
+    next state. 512 bytes, so it lives in L1 for the whole run.
+    """
+    lut = np.zeros(512, dtype=bool)
+    for patch in range(512):
+        bits = [(patch >> k) & 1 for k in range(9)]
+        center = bits[4]
+        neighbors = sum(bits) - center
+        lut[patch] = neighbors == 3 or (center and neighbors == 2)
+    return lut
+
+RULE_LUT = _build_rule_lut()
+
+# Tile edge for cache-blocked evaluation: a (TILE+2)^2 working set (board
+# slice plus convolution temporaries) stays resident in a 256 KB L2 cache.
+TILE = 256
+
 # --- Image Loading ---
 
 def load_board(filepath):
@@ -15,15 +45,11 @@ def load_board(filepath):
     try:
         # Use mode 'r' explicitly for reading image file
         with Image.open(filepath) as img:
-            img = img.convert('RGB') # Ensure consistent RGB format
-            width, height = img.size
-            board = np.zeros((height, width), dtype=np.uint8)
-            pixels = img.load()
-            for r in range(height):
-                for c in range(width):
-                    # Check against tuple version of WHITE
-                    if pixels[c, r][:3] == WHITE: # Slice in case of RGBA
-                        board[r, c] = 1
+            # The board is 1-bit data: grayscale carries a third of the bytes
+            # of RGB, and np.asarray converts in bulk via the buffer protocol
+            arr = np.asarray(img.convert('L'))
+        height, width = arr.shape
+        board = arr > 127
         return board, width, height
     except FileNotFoundError:
         # Print error to standard output
@@ -43,7 +69,6 @@ def load_tunnels(filepath):
         portals_by_loc (dict): Maps (row, col) -> color tuple (R, G, B) for valid portals
         portals_by_color (dict): Maps color tuple -> list of exactly [(row1, col1), (row2, col2)]
     """
-    temp_portals_by_color = defaultdict(list)
     processed_portals_by_loc = {}
     final_portals_by_color = {}
 
@@ -52,17 +77,25 @@ def load_tunnels(filepath):
     try:
         # Use mode 'r' explicitly for reading image file
         with Image.open(filepath) as img:
-            img = img.convert('RGB') # Ensure consistent RGB format
-            width, height = img.size
-            pixels = img.load()
-            # First pass: Collect all locations for each color
-            for r in range(height):
-                for c in range(width):
-                    # Get RGB, ignore alpha if present
-                    color = pixels[c, r][:3]
-                    if color != BLACK:
-                        location = (r, c)
-                        temp_portals_by_color[color].append(location)
+            arr = np.asarray(img.convert('RGB'))
+
+        # First pass: Group the non-black pixels by color entirely in NumPy.
+        # Each RGB triple is packed into one uint32 so np.unique can do the
+        # grouping and duplicate counting in a single vectorized call.
+        # np.nonzero returns coordinates in row-major order, so the per-color
+        # location lists keep the original scan order.
+        rows, cols = np.nonzero(arr.any(axis=2))
+        rgb = arr[rows, cols].astype(np.uint32)
+        packed = (rgb[:, 0] << np.uint32(16)) | (rgb[:, 1] << np.uint32(8)) | rgb[:, 2]
+        unique_colors, inverse = np.unique(packed, return_inverse=True)
+
+        temp_portals_by_color = {}
+        for k, value in enumerate(unique_colors):
+            value = int(value)
+            color = ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+            member = inverse == k
+            temp_portals_by_color[color] = [
+                (int(r), int(c)) for r, c in zip(rows[member], cols[member])]
 
         # Second pass: Validate and process collected portals
         for color, locations in temp_portals_by_color.items():
@@ -101,68 +134,75 @@ def load_tunnels(filepath):
 
 # --- Neighbor Calculation with Wormholes ---
 
-memo_neighbors = {} # Cache neighbor lookups for a given step
-
-def get_other_portal(r, c, color, portals_by_color):
-    """Finds the other portal location for a given portal."""
-    locations = portals_by_color.get(color)
-    # Keep ValueError for internal logic errors, as they shouldn't normally occur
-    # if input validation passes, it would indicate a bug in the script itself.
-    if not locations or len(locations) != 2:
-        raise ValueError(f"Invalid portal data for color {color} at ({r}, {c}) during lookup")
-
-    loc1, loc2 = locations
-    if loc1 == (r, c):
-        return loc2
-    elif loc2 == (r, c):
-        return loc1
-    else:
-        raise ValueError(f"Location ({r}, {c}) not found for color {color} during lookup")
+def build_partner_array(width, height, portals_by_color):
+    """
+    Flattens a portals_by_color dict into an int32 array of width*height
+    entries, where each portal cell holds the flat index (r*width + c) of its
+    paired cell and every other cell holds -1. A single array load replaces
+    the tuple hashing and dict lookups of the portals_by_loc representation.
+    """
+    partner = np.full(width * height, -1, dtype=np.int32)
+    for (r1, c1), (r2, c2) in portals_by_color.values():
+        partner[r1 * width + c1] = r2 * width + c2
+        partner[r2 * width + c2] = r1 * width + c1
+    return partner
+
+# Sentinel for "no partner" once the two int32 arrays are packed into uint64
+NO_PARTNER = 0xFFFFFFFF
 
-# --- (get_actual_neighbor, count_live_neighbors, step functions remain unchanged) ---
-def get_actual_neighbor(r, c, dr, dc, width, height,
-                        h_portals_loc, h_portals_color,
-                        v_portals_loc, v_portals_color):
+def pack_partner_arrays(h_partner, v_partner):
+    """
+    Packs the horizontal and vertical partner-index arrays into a single
+    uint64 per cell: h-partner in the low 32 bits, v-partner in the high 32,
+    with -1 encoded as 0xFFFFFFFF. One load then yields both partners in the
+    scalar neighbor path, and the portal metadata occupies half the bytes of
+    two separate lookups.
+    """
+    low = h_partner.view(np.uint32).astype(np.uint64)
+    high = v_partner.view(np.uint32).astype(np.uint64)
+    return (high << np.uint64(32)) | low
+
+def get_actual_neighbor(r, c, dr, dc, width, height, partners64):
     """
     Calculates the actual coordinates of the neighbor at relative offset (dr, dc)
-    from cell (r, c), considering wormholes and precedence.
+    from cell (r, c), considering wormholes and precedence. partners64 is the
+    packed partner-index array from pack_partner_arrays.
     Precedence: top > right > bottom > left
-    """
-    global memo_neighbors
-    cache_key = (r, c, dr, dc)
-    if cache_key in memo_neighbors:
-        return memo_neighbors[cache_key]
 
+    The result depends only on the static portal topology, so callers should
+    resolve it once per (cell, offset) pair up front (see build_neighbor_table)
+    rather than re-deriving it every step; no per-call caching happens here.
+    """
     nr_res, nc_res = r + dr, c + dc # Default: standard neighbor if no wormhole applies
 
+    pair = int(partners64[r * width + c])
+    hp = pair & NO_PARTNER
+    vp = pair >> 32
+
     # --- Check Wormholes originating from (r, c) based on precedence ---
     wormhole_applied = None # Track which type of wormhole (if any) was applied
 
     # 1. Top Wormhole Check (Vertical Tunnel from (r, c))
-    if (r, c) in v_portals_loc and dr == -1: # Asking for top neighbor (dr=-1)
-        color = v_portals_loc[(r, c)]
-        r_other, c_other = get_other_portal(r, c, color, v_portals_color)
+    if vp != NO_PARTNER and dr == -1: # Asking for top neighbor (dr=-1)
+        r_other, c_other = divmod(vp, width)
         nr_res, nc_res = r_other - 1, c_other + dc
         wormhole_applied = 'top'
 
     # 2. Right Wormhole Check (Horizontal Tunnel from (r, c))
-    if wormhole_applied is None and (r, c) in h_portals_loc and dc == 1: # Asking for right neighbor (dc=1)
-        color = h_portals_loc[(r, c)]
-        r_other, c_other = get_other_portal(r, c, color, h_portals_color)
+    if wormhole_applied is None and hp != NO_PARTNER and dc == 1: # Asking for right neighbor (dc=1)
+        r_other, c_other = divmod(hp, width)
         nr_res, nc_res = r_other + dr, c_other + 1
         wormhole_applied = 'right'
 
     # 3. Bottom Wormhole Check (Vertical Tunnel from (r, c))
-    if wormhole_applied is None and (r, c) in v_portals_loc and dr == 1: # Asking for bottom neighbor (dr=1)
-        color = v_portals_loc[(r, c)]
-        r_other, c_other = get_other_portal(r, c, color, v_portals_color)
+    if wormhole_applied is None and vp != NO_PARTNER and dr == 1: # Asking for bottom neighbor (dr=1)
+        r_other, c_other = divmod(vp, width)
         nr_res, nc_res = r_other + 1, c_other + dc
         wormhole_applied = 'bottom'
 
     # 4. Left Wormhole Check (Horizontal Tunnel from (r, c))
-    if wormhole_applied is None and (r, c) in h_portals_loc and dc == -1: # Asking for left neighbor (dc=-1)
-        color = h_portals_loc[(r, c)]
-        r_other, c_other = get_other_portal(r, c, color, h_portals_color)
+    if wormhole_applied is None and hp != NO_PARTNER and dc == -1: # Asking for left neighbor (dc=-1)
+        r_other, c_other = divmod(hp, width)
         nr_res, nc_res = r_other + dr, c_other - 1
         wormhole_applied = 'left'
 
@@ -173,48 +213,43 @@ def get_actual_neighbor(r, c, dr, dc, width, height,
 
         # Check potential standard neighbor coords are within bounds before checking portals
         if 0 <= nr_std < height and 0 <= nc_std < width:
+            npair = int(partners64[nr_std * width + nc_std])
+            nhp = npair & NO_PARTNER
+            nvp = npair >> 32
 
             # 1. Top neighbor (nr_std, nc_std) has Bottom Wormhole (Vertical Tunnel)?
             #    Applies if we are coming from the cell *above* (nr_std, nc_std) -> dr = 1
-            if (nr_std, nc_std) in v_portals_loc and dr == 1:
-                color = v_portals_loc[(nr_std, nc_std)]
-                r_other, c_other = get_other_portal(nr_std, nc_std, color, v_portals_color)
+            if nvp != NO_PARTNER and dr == 1:
+                r_other, c_other = divmod(nvp, width)
                 nr_res, nc_res = r_other - 1, c_other + (c - nc_std)
                 wormhole_applied = 'symm_top_target'
 
             # 2. Left neighbor (nr_std, nc_std) has Right Wormhole (Horizontal Tunnel)?
             #    Applies if we are coming from the cell *left* of (nr_std, nc_std) -> dc = -1
-            elif wormhole_applied is None and (nr_std, nc_std) in h_portals_loc and dc == -1:
-                color = h_portals_loc[(nr_std, nc_std)]
-                r_other, c_other = get_other_portal(nr_std, nc_std, color, h_portals_color)
+            elif nhp != NO_PARTNER and dc == -1:
+                r_other, c_other = divmod(nhp, width)
                 nr_res, nc_res = r_other + (r - nr_std), c_other - 1
                 wormhole_applied = 'symm_left_target'
 
             # 3. Bottom neighbor (nr_std, nc_std) has Top Wormhole (Vertical Tunnel)?
             #    Applies if we are coming from the cell *below* (nr_std, nc_std) -> dr = -1
-            elif wormhole_applied is None and (nr_std, nc_std) in v_portals_loc and dr == -1:
-                color = v_portals_loc[(nr_std, nc_std)]
-                r_other, c_other = get_other_portal(nr_std, nc_std, color, v_portals_color)
+            elif nvp != NO_PARTNER and dr == -1:
+                r_other, c_other = divmod(nvp, width)
                 nr_res, nc_res = r_other + 1, c_other + (c - nc_std)
                 wormhole_applied = 'symm_bottom_target'
 
             # 4. Right neighbor (nr_std, nc_std) has Left Wormhole (Horizontal Tunnel)?
             #    Applies if we are coming from the cell *right* of (nr_std, nc_std) -> dc = 1
-            elif wormhole_applied is None and (nr_std, nc_std) in h_portals_loc and dc == 1:
-                color = h_portals_loc[(nr_std, nc_std)]
-                r_other, c_other = get_other_portal(nr_std, nc_std, color, h_portals_color)
+            elif nhp != NO_PARTNER and dc == 1:
+                r_other, c_other = divmod(nhp, width)
                 nr_res, nc_res = r_other + (r - nr_std), c_other + 1
                 wormhole_applied = 'symm_right_target'
 
 
-    # Cache the result before returning
-    memo_neighbors[cache_key] = (nr_res, nc_res)
     return nr_res, nc_res
 
 
-def count_live_neighbors(r, c, board, width, height,
-                         h_portals_loc, h_portals_color,
-                         v_portals_loc, v_portals_color):
+def count_live_neighbors(r, c, board, width, height, partners64):
     """Counts live neighbors for cell (r, c) considering wormholes."""
     count = 0
     for dr in [-1, 0, 1]:
@@ -223,8 +258,7 @@ def count_live_neighbors(r, c, board, width, height,
                 continue # Skip self
 
             nr, nc = get_actual_neighbor(r, c, dr, dc, width, height,
-                                         h_portals_loc, h_portals_color,
-                                         v_portals_loc, v_portals_color)
+                                         partners64)
 
             # Check if the neighbor coordinates are within the board bounds
             if 0 <= nr < height and 0 <= nc < width:
@@ -233,45 +267,253 @@ def count_live_neighbors(r, c, board, width, height,
 
     return count
 
-def step(board, width, height,
-         h_portals_loc, h_portals_color,
-         v_portals_loc, v_portals_color):
-    """Performs one iteration of the Game of Life with Wormholes."""
-    global memo_neighbors
-    memo_neighbors.clear() # Clear neighbor cache for the new step
+NEIGHBOR_OFFSETS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                    if (dr, dc) != (0, 0)]
 
-    new_board = np.zeros_like(board)
+def build_neighbor_table(width, height, partners64):
+    """
+    Materializes get_actual_neighbor into an int32 table of shape
+    (width*height, 8) holding the flat index (r*width + c) of each cell's
+    eight neighbors, or -1 where the neighbor falls outside the board. The
+    portal topology never changes, so one O(width*height) pass at startup
+    replaces every per-step neighbor lookup.
+    """
+    table = np.full((width * height, 8), -1, dtype=np.int32)
     for r in range(height):
         for c in range(width):
+            for k, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+                nr, nc = get_actual_neighbor(r, c, dr, dc, width, height,
+                                             partners64)
+                if 0 <= nr < height and 0 <= nc < width:
+                    table[r * width + c, k] = nr * width + nc
+    return table
+
+def portal_affected_cells(width, height, partners64):
+    """
+    Returns the set of (row, col) cells whose neighborhood can differ from the
+    standard Moore neighborhood: the portal cells themselves plus the 8-ring
+    around each one (the symmetric checks in get_actual_neighbor reach exactly
+    one cell away from a portal).
+    """
+    affected = set()
+    no_portals = np.uint64((NO_PARTNER << 32) | NO_PARTNER)
+    portal_flat = np.nonzero(partners64 != no_portals)[0]
+    for flat in portal_flat:
+        r, c = divmod(int(flat), width)
+        for dr in [-1, 0, 1]:
+            for dc in [-1, 0, 1]:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < height and 0 <= nc < width:
+                    affected.add((nr, nc))
+    return affected
+
+def portal_affected_indices(width, height, partners64):
+    """
+    Flat-index form of portal_affected_cells, sorted for cache-friendly
+    gathers. Computed once at load time; the set never changes during a run.
+    """
+    affected = portal_affected_cells(width, height, partners64)
+    return np.array(sorted(r * width + c for (r, c) in affected),
+                    dtype=np.int64)
+
+def evolve_block(block_u8, block_bool):
+    """
+    Computes the next state of one block (dead outside its border): via the
+    SciPy neighbor-count convolution when available, otherwise by packing
+    each cell's 3x3 patch into a 9-bit index from shifted slices and gathering
+    from RULE_LUT — a branch-free pure-NumPy path.
+    """
+    if convolve2d is not None:
+        counts = convolve2d(block_u8, KERNEL, mode='same',
+                            boundary='fill', fillvalue=0)
+        return (counts == 3) | (block_bool & (counts == 2))
+
+    h, w = block_u8.shape
+    padded = np.pad(block_u8, 1)
+    index = np.zeros((h, w), dtype=np.uint16)
+    for k in range(9):
+        dr, dc = divmod(k, 3)
+        index |= padded[dr:dr + h, dc:dc + w].astype(np.uint16) << np.uint16(k)
+    return RULE_LUT[index]
+
+def step(board, new_board, width, height, partners64,
+         flat_nbr=None, dirty_idx=None, prev_changed=None):
+    """
+    Performs one iteration of the Game of Life with Wormholes, reading from
+    board and writing every cell of new_board. The two buffers are allocated
+    once by the caller and ping-ponged between iterations, so the step itself
+    allocates no board-sized output.
+
+    prev_changed, if given, is the boolean mask of cells that changed in the
+    previous step. A cell's next state can only differ if something in its
+    3x3 neighborhood changed, so tiles whose halo contains no changed cell
+    are copied through instead of recomputed. Cells with portal-modified
+    neighborhoods always go through the correction pass, which covers their
+    non-local dependencies.
+
+    Returns new_board for convenience.
+    """
+    # Bulk path: evolve_block applies the B3/S23 rules with cells outside the
+    # boundary permanently dead. Boards larger than one tile are processed in
+    # TILE x TILE blocks with a one-cell halo, so each block's working set
+    # stays cache-resident instead of streaming full-board temporaries
+    # through DRAM. The board is boolean; evolve_block needs an integer view
+    # of it, but the rule application stays boolean end to end.
+    board_u8 = board.view(np.uint8)
+    if height <= TILE and width <= TILE:
+        if prev_changed is not None and not prev_changed.any():
+            np.copyto(new_board, board)
+        else:
+            new_board[...] = evolve_block(board_u8, board)
+    else:
+        for r0 in range(0, height, TILE):
+            for c0 in range(0, width, TILE):
+                r1, c1 = min(r0 + TILE, height), min(c0 + TILE, width)
+                # Halo of one real cell where available; the zero fill at the
+                # block border covers the true board edges
+                hr0, hc0 = max(r0 - 1, 0), max(c0 - 1, 0)
+                hr1, hc1 = min(r1 + 1, height), min(c1 + 1, width)
+                if (prev_changed is not None
+                        and not prev_changed[hr0:hr1, hc0:hc1].any()):
+                    # Quiescent tile: nothing in reach changed last step
+                    new_board[r0:r1, c0:c1] = board[r0:r1, c0:c1]
+                    continue
+                block = evolve_block(board_u8[hr0:hr1, hc0:hc1],
+                                     board[hr0:hr1, hc0:hc1])
+                new_board[r0:r1, c0:c1] = block[r0 - hr0:r1 - hr0,
+                                                c0 - hc0:c1 - hc0]
+
+    # Correction pass: only cells whose neighborhood a wormhole can alter need
+    # the per-cell lookup; everywhere else the bulk result is already correct.
+    if flat_nbr is not None:
+        if dirty_idx is None:
+            dirty_idx = portal_affected_indices(width, height,
+                                                partners64)
+        if dirty_idx.size:
+            flat = board.ravel()
+            nbr = flat_nbr[dirty_idx]
+            # -1 marks out-of-bounds neighbors, which are permanently dead
+            counts = np.where(nbr >= 0, flat[nbr.clip(min=0)], 0).sum(axis=1)
+            current = flat[dirty_idx]
+            new_board.ravel()[dirty_idx] = ((counts == 3) |
+                                            (current & (counts == 2)))
+    else:
+        for (r, c) in portal_affected_cells(width, height, partners64):
             live_neighbors = count_live_neighbors(r, c, board, width, height,
-                                                  h_portals_loc, h_portals_color,
-                                                  v_portals_loc, v_portals_color)
-            current_state = board[r, c]
-
-            # Apply Game of Life rules
-            if current_state == 1: # Live cell
-                if live_neighbors < 2 or live_neighbors > 3:
-                    new_board[r, c] = 0 # Dies
-                else:
-                    new_board[r, c] = 1 # Lives
+                                                  partners64)
+            if board[r, c] == 1: # Live cell
+                new_board[r, c] = 1 if live_neighbors in (2, 3) else 0
             else: # Dead cell
-                if live_neighbors == 3:
-                    new_board[r, c] = 1 # Becomes alive
+                new_board[r, c] = 1 if live_neighbors == 3 else 0
 
     return new_board
-# --- End unchanged functions ---
+
+def step_torch(board_t, kernel_t, nbr_t=None, idx_t=None):
+    """
+    Performs one Game of Life step on a (1, 1, height, width) float tensor,
+    on whatever device the tensors live on. The 3x3 convolution maps directly
+    onto the GPU kernel and the board stays resident on the device across
+    iterations, so transfer costs are paid only at the save iterations.
+
+    nbr_t and idx_t, when given, are the portal-affected rows of the
+    neighbor-index table and their flat cell indices (see
+    build_neighbor_table), already on the same device; they drive the
+    wormhole correction as a gather-and-sum, mirroring step().
+    """
+    import torch.nn.functional as F
+
+    counts = F.conv2d(board_t, kernel_t, padding=1)
+    new_t = ((counts == 3) | ((board_t == 1) & (counts == 2))).to(board_t.dtype)
+
+    if idx_t is not None and idx_t.numel():
+        flat = board_t.reshape(-1)
+        # -1 marks out-of-bounds neighbors, which are permanently dead
+        gathered = flat[nbr_t.clamp(min=0)] * (nbr_t >= 0)
+        counts = gathered.sum(dim=1)
+        current = flat[idx_t]
+        fixed = (counts == 3) | ((current == 1) & (counts == 2))
+        new_t.reshape(-1)[idx_t] = fixed.to(board_t.dtype)
+
+    return new_t
+
+# --- Bit-packed fast path (boards without wormholes) ---
+# Storing 64 cells per uint64 word cuts memory traffic 8x versus one byte per
+# cell and lets a handful of bitwise ops update 64 cells at once. The wormhole
+# correction pass needs random per-cell access, so this representation is only
+# used when both tunnel maps are empty.
+
+def pack_board(board):
+    """Packs a (height, width) boolean board into 64 cells per np.uint64 word."""
+    height, width = board.shape
+    words = (width + 63) // 64
+    padded = np.zeros((height, words * 64), dtype=np.uint8)
+    padded[:, :width] = board
+    # Column c lands in word c // 64, bit c % 64 (little-endian machines)
+    return np.packbits(padded, axis=1, bitorder='little').view(np.uint64)
+
+def unpack_board(packed, width):
+    """Expands a bit-packed board back to one boolean cell per entry."""
+    return np.unpackbits(packed.view(np.uint8), axis=1,
+                         bitorder='little').view(np.bool_)[:, :width]
+
+def step_packed(packed, width):
+    """
+    Performs one Game of Life step on a bit-packed board.
+
+    Branchless SWAR update: each row's horizontal triple sums are built with
+    half adders into bit-sliced 2-bit counts, then the three row counts are
+    combined with carry-save adders into a bit-sliced 4-bit total per cell.
+    The total includes the center cell, so the B3/S23 rules become
+    "total == 3, or alive and total == 4".
+    """
+    one, s63 = np.uint64(1), np.uint64(63)
+
+    # Horizontal neighbors, carrying bits across word boundaries
+    west = packed << one
+    west[:, 1:] |= packed[:, :-1] >> s63
+    east = packed >> one
+    east[:, :-1] |= packed[:, 1:] << s63
+
+    # Per-row triple sum (west + center + east), bit-sliced: ones + 2*twos
+    ones = west ^ packed ^ east
+    twos = (west & packed) | (west & east) | (packed & east)
+
+    def row_shift(a, dr):
+        out = np.zeros_like(a)
+        if dr < 0:
+            out[1:] = a[:-1]
+        else:
+            out[:-1] = a[1:]
+        return out
+
+    oa, ob, oc = row_shift(ones, -1), ones, row_shift(ones, 1)
+    ta, tb, tc = row_shift(twos, -1), twos, row_shift(twos, 1)
+
+    # Total per cell = b0 + 2*b1 + 4*b2 + 8*b3 (0..9, center included)
+    b0 = oa ^ ob ^ oc
+    carry = (oa & ob) | (oa & oc) | (ob & oc)
+    t1 = ta ^ tb
+    c1 = ta & tb
+    t2 = t1 ^ tc
+    c2 = t1 & tc
+    b1 = t2 ^ carry
+    c3 = t2 & carry
+    b2 = c1 ^ c2 ^ c3
+    b3 = (c1 & c2) | (c1 & c3) | (c2 & c3)
+
+    new_packed = (b0 & b1 & ~b2 & ~b3) | (packed & ~b0 & ~b1 & b2 & ~b3)
+
+    # Keep the padding bits beyond `width` in the last word permanently dead
+    if width % 64:
+        new_packed[:, -1] &= np.uint64((1 << (width % 64)) - 1)
+    return new_packed
 
 # --- Output ---
 
 def save_board(board, filepath):
-    """Saves the board state to a PNG file."""
-    height, width = board.shape
-    img = Image.new('RGB', (width, height), color=BLACK)
-    pixels = img.load()
-    for r in range(height):
-        for c in range(width):
-            if board[r, c] == 1:
-                pixels[c, r] = WHITE
+    """Saves the board state to a grayscale PNG file."""
+    # A byte view of the boolean board avoids an astype pass over the cells
+    img = Image.fromarray(board.view(np.uint8) * 255, mode='L')
     try:
         img.save(filepath)
     except Exception as e:
@@ -288,6 +530,8 @@ def main():
     parser = argparse.ArgumentParser(description="Run Conway's Game of Life with Wormholes.")
     # argparse handles relative paths correctly, so no change needed here.
     parser.add_argument("input_dir", help="Directory containing starting_position.png, horizontal_tunnel.png, and vertical_tunnel.png")
+    parser.add_argument("--gpu", action="store_true",
+                        help="Run the simulation on a CUDA GPU via PyTorch")
     args = parser.parse_args()
 
     input_dir = args.input_dir
@@ -309,28 +553,89 @@ def main():
     v_portals_loc, v_portals_color = load_tunnels(v_tunnel_file)
     print(f"Found {len(v_portals_color)} vertical wormholes.")
 
+    # Dense partner-index arrays are the working portal representation; the
+    # loader dicts are only kept around for validation and reporting.
+    h_partner = build_partner_array(width, height, h_portals_color)
+    v_partner = build_partner_array(width, height, v_portals_color)
+    partners64 = pack_partner_arrays(h_partner, v_partner)
+
+    # Static per-cell neighbor indices, resolved through wormholes once,
+    # and the fixed set of cells the correction pass must revisit
+    flat_nbr = build_neighbor_table(width, height, partners64)
+    dirty_idx = portal_affected_indices(width, height, partners64)
+
     output_iterations = {1, 10, 100, 1000}
     max_iterations = max(output_iterations)
 
     print(f"Starting simulation for {max_iterations} iterations...")
     start_time = time.time()
 
+    # Without wormholes the board can stay bit-packed for the whole run,
+    # unpacking only at the save iterations.
+    use_gpu = args.gpu
+    if use_gpu:
+        # PyTorch is only needed (and imported) for the GPU path
+        try:
+            import torch
+        except ImportError:
+            print("Error: --gpu requires PyTorch (pip install torch)")
+            exit(1)
+        if not torch.cuda.is_available():
+            print("Error: --gpu requested but no CUDA device is available")
+            exit(1)
+        device = torch.device('cuda')
+        board_t = torch.from_numpy(board).to(device).view(1, 1, height, width).float()
+        kernel_t = torch.from_numpy(KERNEL.astype(np.float32)).to(device).view(1, 1, 3, 3)
+        if dirty_idx.size:
+            nbr_t = torch.from_numpy(flat_nbr[dirty_idx].astype(np.int64)).to(device)
+            idx_t = torch.from_numpy(dirty_idx).to(device)
+        else:
+            nbr_t = idx_t = None
+
+    use_packed = dirty_idx.size == 0 and not use_gpu
+    if use_packed:
+        packed = pack_board(board)
+
+    # Double buffering: board and spare ping-pong between iterations so no
+    # board-sized array is allocated inside the loop.
+    spare = np.empty_like(board)
+    changed = None # Active-cell mask fed back into step(); None = everything
+    changed_buf = np.empty(board.shape, dtype=bool)
+
+    # PNG encoding happens on a background thread (PIL releases the GIL in
+    # libpng), overlapping the save iterations with the next steps.
+    executor = ThreadPoolExecutor(max_workers=1)
+
     # Single Simulation Loop
     for i in range(1, max_iterations + 1):
-        board = step(board, width, height,
-                     h_portals_loc, h_portals_color,
-                     v_portals_loc, v_portals_color)
+        if use_gpu:
+            board_t = step_torch(board_t, kernel_t, nbr_t, idx_t)
+        elif use_packed:
+            packed = step_packed(packed, width)
+        else:
+            step(board, spare, width, height, partners64,
+                 flat_nbr, dirty_idx, changed)
+            changed = np.not_equal(spare, board, out=changed_buf)
+            board, spare = spare, board
 
         if i in output_iterations:
+            if use_gpu:
+                board = board_t.view(height, width).byte().cpu().numpy()
+            elif use_packed:
+                board = unpack_board(packed, width)
             output_filename = f"{base_path}/{i}.png"
             print(f"Saving state after iteration {i} to {output_filename}...")
-            save_board(board, output_filename)
+            # Copy: the simulation keeps mutating its buffers while the
+            # encoder runs
+            executor.submit(save_board, board.copy(), output_filename)
 
         if i % 50 == 0 and i not in output_iterations:
              current_time = time.time()
              elapsed = current_time - start_time
              print(f"  Completed iteration {i}/{max_iterations} ({elapsed:.2f}s elapsed)")
 
+    executor.shutdown(wait=True) # Make sure all snapshots hit disk
+
     end_time = time.time()
     print(f"\nSimulation finished in {end_time - start_time:.2f} seconds.")
 